@@ -3,14 +3,15 @@
 # pylint: disable=too-many-ancestors
 
 # standard library
+import io
 import os
 import sys
 import re
 import argparse
+import subprocess
 from shutil import copy2
-# from subprocess import Popen, PIPE
 # import time
-# from lxml import etree
+from lxml import etree
 
 # local library
 import inkex
@@ -22,6 +23,95 @@ if (sys.version_info.major, sys.version_info.minor) < (3, 6):
     inkex.Effect.msg(f"Python {MIN_PYTHON_VERSION[0]}.{MIN_PYTHON_VERSION[1]} or later required.")
     sys.exit(1)
 
+# Patterns used by find() to translate the shorthand xpath syntax, compiled
+# once at import time instead of on every call.
+BASIC_TAGS = ('circle', 'ellipse', 'line', 'polygon', 'polyline', 'rect', 'path', 'image', 'g')
+SPECIAL_TAGS = {
+    'l': "svg:g[@inkscape:groupmode='layer']",
+    'p': 'svg:path',
+    'img': 'svg:image'
+}
+_BASIC_TAG_RE = re.compile(r'((?<=/)(' + '|'.join(BASIC_TAGS) + r')\b)')
+_SPECIAL_TAG_RES = {re.compile('(?<=/)' + k + r'\b'): v for k, v in SPECIAL_TAGS.items()}
+_SLICE_RE = re.compile(r'(?<=\[)(\d+):(\d+)(?=\])')
+
+# Fully qualified names for the shorthand tags that denote one concrete svg
+# element, used by the fast path for plain '//tag' queries.
+_TAG_URIS = {tag: '{http://www.w3.org/2000/svg}' + tag for tag in BASIC_TAGS}
+_TAG_URIS['p'] = _TAG_URIS['path']
+_TAG_URIS['img'] = _TAG_URIS['image']
+_DESCENDANT_TAG_RE = re.compile(r'//(\w+)')
+
+# Wrapper classes find() excludes from its results; frozenset for O(1)
+# membership tests in the per-match loop.
+_META_TYPENAMES = frozenset(('Defs', 'NamedView', 'Metadata'))
+
+
+# Extract the name preceding the colon in each line of
+# 'inkscape --action-list' output.
+_ACTION_LINE_RE = re.compile(r'^.+?(?= *:)', re.M)
+
+# Names advertised by 'inkscape --action-list'; None until loaded.
+_KNOWN_ACTIONS = None
+
+# Whether the installed inkscape understands --pipe; None until checked.
+_PIPE_SUPPORTED = None
+
+
+def _known_actions():
+    """Return the set of true action names (loaded once per process).
+
+    Verbs are deliberately absent from this set: they need the GUI, and a
+    headless --pipe run leaves them unapplied while still exiting 0, so a
+    list destined for --pipe must consist of these names only."""
+    global _KNOWN_ACTIONS
+    if _KNOWN_ACTIONS is None:
+        try:
+            out = subprocess.run(['inkscape', '--action-list'], capture_output=True).stdout.decode()
+        except OSError:
+            out = ''
+        _KNOWN_ACTIONS = frozenset(_ACTION_LINE_RE.findall(out))
+    return _KNOWN_ACTIONS
+
+
+def _inkscape_supports_pipe():
+    """Check (once per process) whether inkscape supports --pipe."""
+    global _PIPE_SUPPORTED
+    if _PIPE_SUPPORTED is None:
+        try:
+            help_text = subprocess.run(['inkscape', '--help'], capture_output=True).stdout.decode()
+        except OSError:
+            help_text = ''
+        _PIPE_SUPPORTED = '--pipe' in help_text
+    return _PIPE_SUPPORTED
+
+
+def _rep(obj):
+    """Short representation of a single object, used by show()."""
+    if hasattr(obj, 'get_id'):
+        return f"{type(obj).__name__}({obj.get_id()})"
+    return f"{type(obj).__name__}"
+
+# Compiled etree.XPath evaluators, keyed by the (shorthand) xpath string.
+_XPATH_CACHE = {}
+
+
+def _compile_xpath(xpath):
+    """Translate the shorthand xpath syntax and compile it to an evaluator.
+
+    The translation and libxml2 compilation are done once per distinct
+    expression; subsequent find() calls reuse the cached callable."""
+    compiled = _XPATH_CACHE.get(xpath)
+    if compiled is None:
+        translated = _BASIC_TAG_RE.sub(r'svg:\1', xpath)
+        for pattern, v in _SPECIAL_TAG_RES.items():
+            translated = pattern.sub(v, translated)
+        translated = _SLICE_RE.sub(r'position()>=\1 and position()<\2', translated)
+
+        compiled = etree.XPath(translated, namespaces=inkex.NSS)
+        _XPATH_CACHE[xpath] = compiled
+    return compiled
+
 
 class BaseExtension(inkex.Effect):
     """Custom class that makes creation of extensions easier.
@@ -46,61 +136,101 @@ class BaseExtension(inkex.Effect):
         inkex.Effect.__init__(self)
         self.custom_effect = custom_effect
 
-        self._msg = self.msg  # The old msg function provided by inkex (only accepts strings)
-        def msg(*args, sep=' '):
-            """Improved msg method, similar to Python's print"""
-            self._msg(sep.join([str(arg) for arg in args]))
-        self.msg = msg
-
         if args_adder is not None:
             args_adder(self.arg_parser)
             self.args_adder = args_adder
 
+        # Cache of find() results, keyed by (id(obj), xpath). The queried
+        # object is stored alongside the result to keep it alive, so its id()
+        # cannot be reused while the cache entry exists. Valid for the
+        # duration of one effect() run only.
+        self._find_cache = {}
+
+        # Lazily built map of id(element) -> ordinal in document order,
+        # shared by all z_sort calls against the same tree.
+        self._doc_order = None
+
+
+    def invalidate_caches(self):
+        """Drop the per-tree caches (find results and document order).
 
+        Called whenever self.document changes identity, since cached
+        elements and ordinals belong to the old tree."""
+        self._find_cache.clear()
+        self._doc_order = None
+
+
+    def msg(self, *args, sep=' '):
+        """Improved msg method, similar to Python's print.
+
+        Overrides the inkex-provided msg, a staticmethod which only accepts
+        a single string."""
+        inkex.Effect.msg(sep.join(map(str, args)))
+
+
+    def _doc_order_index(self):
+        """Return map of id(element) -> ordinal in document order.
+
+        Built with a single tree walk and reused by subsequent calls, so N
+        sorts cost one walk instead of N."""
+        if self._doc_order is None:
+            self._doc_order = {id(el): i for i, el in enumerate(self.document.getroot().iter())}
+        return self._doc_order
 
 
     def z_sort(self, alist):
-        """Return new list sorted in document order (depth-first traversal)."""
-        return list(self.z_iter(alist))
+        """Return new list sorted in document order (depth-first traversal).
+
+        As with z_iter, elements not in the tree are dropped and duplicates
+        collapse to a single occurrence."""
+        # Dedup by identity, like z_iter's id()-keyed dict does.
+        unique = list({id(e): e for e in alist}.values())
+        if len(unique) < 2:
+            # Already trivially ordered; check tree membership via the
+            # element's own root instead of walking the whole tree.
+            root = self.document.getroot()
+            return [e for e in unique if e.getroottree().getroot() is root]
+        order = self._doc_order_index()
+        # Elements no longer in the tree are dropped, as z_iter would do.
+        return sorted((e for e in unique if id(e) in order), key=lambda e: order[id(e)])
 
 
     def z_iter(self, alist):
         """Return iterator over ids in document order (depth-first traversal)."""
-        id_list = list(alist)
-        count = len(id_list)
+        # Membership tests on a list of lxml elements are linear, so keep the
+        # pending elements in a dict keyed by id() for O(1) lookups instead.
+        remaining = {id(obj): obj for obj in alist}
+        if not remaining:
+            return
+        pop = remaining.pop
         for element in self.document.getroot().iter():
-            # element_id = element.get('id')
-            # if element_id is not None and element_id in id_list:
-            if element in alist:
-                id_list.remove(element)
-                yield element
-                count -= 1
-                if not count:
+            obj = pop(id(element), None)
+            if obj is not None:
+                yield obj
+                if not remaining:
                     return
 
     @staticmethod
     def show(obj):
         """Returns a str representation of object"""
-        def rep(obj):
-            if hasattr(obj, 'get_id'):
-                return f"{type(obj).__name__}({obj.get_id()})"
-            return f"{type(obj).__name__}"
-
-
         if type(obj).__name__ == 'ElementList':
             return ('ElementList(' +
-                ', '.join([rep(child) for child in obj.values()]) +
+                ', '.join(_rep(child) for child in obj.values()) +
                 ')')
         if isinstance(obj, list):
-            return '[' + ', '.join(rep(child) for child in obj) + ']'
+            return '[' + ', '.join(_rep(child) for child in obj) + ']'
 
 
-        return rep(obj)
+        return _rep(obj)
 
 
     def find(self, obj: any, xpath='/*') -> list:
         """Returns a list of objects which satisfies XPath
 
+        Results are cached per (obj, xpath) pair for the duration of one
+        effect() run. A custom_effect that mutates the tree between calls
+        should call invalidate_caches() to get fresh results.
+
         Args:
             obj (any): Parent object to recurse into. Examples include root, selected, or a group.
             xpath (str, optional): Defaults to '/*'.
@@ -109,41 +239,65 @@ class BaseExtension(inkex.Effect):
             list: [description]
         """
 
-        BASIC_TAGS = ('circle', 'ellipse', 'line', 'polygon', 'polyline', 'rect', 'path', 'image', 'g')
-        SPECIAL_TAGS = {
-            'l': "svg:g[@inkscape:groupmode='layer']",
-            'p': 'svg:path'
-        }
-
-        xpath = re.sub(r'((?<=/)(' + '|'.join(BASIC_TAGS) + r')\b)', r'svg:\1', xpath)
-        for k, v in SPECIAL_TAGS.items():
-            xpath = re.sub('(?<=/)' + k + r'\b', v, xpath)
-
-        xpath = re.sub(r'(?<=\[)(\d+):(\d+)(?=\])', r'position()>=\1 and position()<\2', xpath)
+        cache_key = (id(obj), xpath)
+        cached = self._find_cache.get(cache_key)
+        if cached is not None:
+            return list(cached[1])
 
         if type(obj).__name__ != 'ElementList':
             obj = [obj]
 
         output = []
-        for child in obj:
-            matches =  child.xpath(xpath, namespaces={
-                                'svg': 'http://www.w3.org/2000/svg',
-                                'inkscape': 'http://www.inkscape.org/namespaces/inkscape'})
-            for match in matches:
-                if type(match).__name__ not in ('Defs', 'NamedView', 'Metadata'):
-                    output.append(match)
-
-        return output
+        m = _DESCENDANT_TAG_RE.fullmatch(xpath)
+        if m is not None and m.group(1) in _TAG_URIS:
+            # A plain '//tag' query with a concrete tag: enumerate matching
+            # elements directly via lxml's C-level iter() instead of having
+            # the xpath engine visit every node in the tree. '//' is
+            # absolute, so matches are the same for every context node.
+            matches = list(self.document.getroot().iter(_TAG_URIS[m.group(1)]))
+            for child in obj:
+                output.extend(matches)
+        else:
+            evaluate = _compile_xpath(xpath)
+            for child in obj:
+                output.extend(match for match in evaluate(child)
+                              if type(match).__name__ not in _META_TYPENAMES)
+
+        self._find_cache[cache_key] = (obj, output)
+        return list(output)
 
 
     def effect(self):
         """Main entry point to process current document. Not to be called externally."""
 
+        self.invalidate_caches()
         actions_list = self.custom_effect(self)
 
         if actions_list is None or actions_list == []:
             self.msg("No actions received. Perhaps you are calling inkex object methods?")
         elif isinstance(actions_list, list):
+            if (_inkscape_supports_pipe()
+                    and all(a.split(':', 1)[0] in _known_actions() for a in actions_list)):
+                # Stream the SVG through inkscape in memory: no tempfile
+                # copy and no save/load round-trip on disk. Only safe when
+                # every entry is a true action; verbs silently do nothing
+                # without the GUI.
+                with open(self.options.input_file, 'rb') as svg_file:
+                    svg_bytes = svg_file.read()
+                # --export-type pins the output format: '-' has no file
+                # extension for inkscape to infer it from.
+                proc = subprocess.run(
+                    ['inkscape', '--pipe', '--export-type=svg',
+                     '--export-filename=-',
+                     '--actions=' + ";".join(actions_list)],
+                    input=svg_bytes, capture_output=True)
+                if proc.returncode == 0 and proc.stdout:
+                    self.document = inkex.load_svg(io.BytesIO(proc.stdout))
+                    self.svg = self.document.getroot()
+                    self.invalidate_caches()
+                    return
+                # Piping failed; fall back to the tempfile round-trip.
+
             tempfile = self.options.input_file + "-BaseExtension.svg"
 
             # prepare
@@ -161,6 +315,8 @@ class BaseExtension(inkex.Effect):
             self.document = inkex.load_svg(tempfile)
             # update self.svg
             self.svg = self.document.getroot()
+            # cached results refer to the old tree
+            self.invalidate_caches()
 
 
         # Clean up tempfile
@@ -3,6 +3,8 @@ import os
 import sys
 import re
 import subprocess
+from itertools import chain
+from shutil import which
 
 from BaseExtension import BaseExtension
 
@@ -17,6 +19,54 @@ or imported for use by another extension. This workaround is done via the 'optio
 the 'custom_effect' function"""
 
 
+VERBS_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.cache', 'inkscape-extensions', 'verbs.txt')
+
+# Extract the name preceding the colon in each line of
+# 'inkscape --verb-list' / 'inkscape --action-list' output.
+_VERB_RE = re.compile(r'^.+?(?=:)', re.M)
+_ACTION_RE = re.compile(r'^.+?(?= *:)', re.M)
+
+
+def _load_verbs_and_actions():
+    """Return the set of valid inkscape verb and action names.
+
+    Spawning inkscape twice just to list its verbs takes hundreds of ms, so
+    the output is cached on disk and reused until the inkscape binary
+    changes (detected via its mtime)."""
+
+    inkscape_bin = which('inkscape')
+    try:
+        if inkscape_bin is not None and os.path.getmtime(VERBS_CACHE_FILE) >= os.path.getmtime(inkscape_bin):
+            with open(VERBS_CACHE_FILE) as cache:
+                return frozenset(cache.read().splitlines())
+    except OSError:
+        pass
+
+    if inkscape_bin is None:
+        # No inkscape on PATH: degrade to an empty set so verification
+        # reports the clean invalid-action message instead of tracebacking.
+        return frozenset()
+
+    proc = subprocess.run(["inkscape", "--verb-list"], capture_output=True)
+    valid = set(_VERB_RE.findall(proc.stdout.decode()))
+
+    proc = subprocess.run(["inkscape", "--action-list"], capture_output=True)
+    valid.update(_ACTION_RE.findall(proc.stdout.decode()))
+
+    if valid:
+        # Only persist a non-empty result: a transient inkscape failure
+        # must cost one run, not poison the cache until the binary's
+        # mtime changes.
+        try:
+            os.makedirs(os.path.dirname(VERBS_CACHE_FILE), exist_ok=True)
+            with open(VERBS_CACHE_FILE, 'w') as cache:
+                cache.write('\n'.join(sorted(valid)))
+        except OSError:
+            pass  # caching is best-effort; just rerun inkscape next time
+
+    return frozenset(valid)
+
+
 def custom_effect(self: BaseExtension):
     """Note: The init of the BaseExtension class will set its 'custom_effect' attr
     to this function. Hence, the self arg is of type BaseExtension."""
@@ -26,13 +76,7 @@ def custom_effect(self: BaseExtension):
     root = self.document.getroot()
     actions_list = []
 
-    proc = subprocess.run("inkscape --verb-list | grep -oP '^.+?(?=:)'",
-                            shell=True, capture_output=True)
-    valid_actions_and_verbs = proc.stdout.decode().splitlines()
-
-    proc = subprocess.run("inkscape --action-list | grep -oP '^.+?(?= *:)'",
-                            shell=True, capture_output=True)
-    valid_actions_and_verbs += proc.stdout.decode().splitlines()
+    valid_actions_and_verbs = _load_verbs_and_actions()
 
 
     self.options.dry_run = self.options.dry_run == 'true'
@@ -44,24 +88,12 @@ def custom_effect(self: BaseExtension):
             raise ValueError(action)
 
     def select_do_individually(objs, actions):
-        for obj in objs:
-            actions_list.append("EditDeselect")
-            actions_list.append("select-by-id:" + obj.get_id())
-            if isinstance(actions, str):
-                actions = [actions]
-            for action in actions:
-                verify_action(action)
-                actions_list.append(action)
+        actions_list.extend(chain.from_iterable(
+            ("EditDeselect", "select-by-id:" + obj.get_id(), *actions) for obj in objs))
 
     def select_do_on_all(objs, actions):
-        for obj in objs:
-            actions_list.append("select-by-id:" + obj.get_id())
-
-        if isinstance(actions, str):
-            actions = [actions]
-        for action in actions:
-            verify_action(action)
-            actions_list.append(action)
+        actions_list.extend("select-by-id:" + obj.get_id() for obj in objs)
+        actions_list.extend(actions)
     effects = []
     try:
         if self.options.tab_effect is None:
@@ -74,14 +106,14 @@ def custom_effect(self: BaseExtension):
             for attr in ('effect_' + self.options.tab_effect.lower() + str(i) for i in range(1, 4)):
                 e = getattr(self.options, attr)
                 if e != None:
-                    effects += [e.strip()]
+                    effects.append(e.strip())
             if effects == []:
                 raise ValueError
         elif self.options.tab_effect == 'Multi':
             if self.options.effects is None:
                 raise ValueError
             for line in self.options.effects.split('\\n'):
-                effects += [e.strip() for e in line.split(';') if e != '']
+                effects.extend(e.strip() for e in line.split(';') if e != '')
     except ValueError:
         self.msg("No effects inputted! Quitting...")
         sys.exit(0)
@@ -99,6 +131,10 @@ def custom_effect(self: BaseExtension):
 
 
     try:
+        # The same effects apply to every object, so verify them once here
+        # instead of per object inside the helpers.
+        for action in effects:
+            verify_action(action)
         if self.options.mode == 'all':
             select_do_on_all(objects, effects)
         elif self.options.mode == 'indiv':